@@ -20,15 +20,19 @@ Outputs:
 Generated: 2026-02-19, updated with stratification
 """
 
+import math
 import os
 import sys
+from collections import namedtuple
 import numpy as np
 import pandas as pd
 from scipy import stats
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap
+
+try:  # optional: columnar CSV parsing via read_csv(engine='pyarrow')
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
 
 # ---- Configuration ----
 RESULTS_DIR = os.path.join('.', 'results')
@@ -38,55 +42,151 @@ SPEARMAN_RHO_THRESHOLD = 0.5
 COHENS_D_THRESHOLD = 0.5
 MCNEMAR_P_THRESHOLD = 0.05
 ALPHA = 0.05
+_Z95 = float(stats.norm.ppf(0.975))  # two-sided 95% critical value
+
+# Narrow dtypes for the columns the analysis consumes; anything else in
+# the CSV (e.g. threshold_adjusted) is never materialized.
+COL_DTYPES = {'func_name': object, 'inlined': np.int8, 'opt_level': np.int8,
+              'ir_count': np.int16, 'shadow_price': np.float32,
+              'threshold_baseline': np.int16}
 
 SIZE_LABELS = {10: 'Tiny (10)', 50: 'Small (50)', 100: 'Medium (100)',
                200: 'Large (200)', 500: 'Huge (500)'}
 OPT_LABELS = {0: 'O0 (thresh=20)', 1: 'O1 (thresh=50)', 2: 'O2 (thresh=100)'}
 
+# Scatter colors indexed by inlined (0 = #e74c3c, 1 = #2ecc71), alpha 0.4
+_SCAT_RGBA = np.array([[0.906, 0.298, 0.235, 0.4],
+                       [0.180, 0.800, 0.443, 0.4]], dtype=np.float32)
+
 
 # ---- Helper Functions ----
 
 def cohens_d(group1, group2):
-    n1, n2 = len(group1), len(group2)
+    a = np.asarray(group1, dtype=np.float64)
+    b = np.asarray(group2, dtype=np.float64)
+    n1, n2 = a.size, b.size
     if n1 < 2 or n2 < 2:
         return 0.0
-    var1 = np.var(group1, ddof=1)
-    var2 = np.var(group2, ddof=1)
+    # Mean and variance from sum / sum-of-squares, shifted by the first
+    # element so a large common offset does not cancel out the spread
+    a0 = a - a[0]
+    b0 = b - b[0]
+    m1, m2 = a0.sum() / n1, b0.sum() / n2
+    var1 = (np.dot(a0, a0) - n1 * m1 * m1) / (n1 - 1)
+    var2 = (np.dot(b0, b0) - n2 * m2 * m2) / (n2 - 1)
     pooled_std = np.sqrt(((n1 - 1) * var1 + (n2 - 1) * var2) / (n1 + n2 - 2))
     if pooled_std == 0:
         return 0.0
-    return (np.mean(group1) - np.mean(group2)) / pooled_std
+    return ((a[0] + m1) - (b[0] + m2)) / pooled_std
+
+
+def cohens_d_binary(group1, group2):
+    """Cohen's d for 0/1 groups: variance is p(1-p) scaled to ddof=1."""
+    n1, n2 = group1.size, group2.size
+    if n1 < 2 or n2 < 2:
+        return 0.0
+    p1 = np.count_nonzero(group1) / n1
+    p2 = np.count_nonzero(group2) / n2
+    var1 = p1 * (1 - p1) * n1 / (n1 - 1)
+    var2 = p2 * (1 - p2) * n2 / (n2 - 1)
+    pooled_std = math.sqrt(((n1 - 1) * var1 + (n2 - 1) * var2) / (n1 + n2 - 2))
+    if pooled_std == 0:
+        return 0.0
+    return (p1 - p2) / pooled_std
+
+
+def is_binary(values):
+    """True if values are bool or integers restricted to {0, 1}."""
+    if values.dtype == np.bool_:
+        return True
+    return (np.issubdtype(values.dtype, np.integer)
+            and (values.size == 0 or (values.min() >= 0 and values.max() <= 1)))
+
+
+def _decision_bytes(decisions):
+    """0/1 decisions as a uint8 array (zero-copy for 1-byte input)."""
+    v = np.asarray(decisions)
+    if v.dtype.itemsize == 1 and v.dtype.kind in 'biu':
+        return v.view(np.uint8)
+    # Wider dtypes: map anything other than 0/1 to 2 so it gets filtered
+    return np.where((v == 0) | (v == 1), v, 2).astype(np.uint8)
 
 
 def mcnemar_test(decisions_a, decisions_b):
-    both_yes = np.sum((decisions_a == 1) & (decisions_b == 1))
-    both_no = np.sum((decisions_a == 0) & (decisions_b == 0))
-    a_yes_b_no = np.sum((decisions_a == 1) & (decisions_b == 0))
-    a_no_b_yes = np.sum((decisions_a == 0) & (decisions_b == 1))
+    ua = _decision_bytes(decisions_a)
+    ub = _decision_bytes(decisions_b)
+    # Pairs where either decision is not 0/1 are left out of the table
+    # (int8 -1 views as 255, so a byte-wide max catches it)
+    if ua.size and (ua.max() > 1 or ub.max() > 1):
+        valid = (ua <= 1) & (ub <= 1)
+        ua, ub = ua[valid], ub[valid]
+    # 2x2 contingency from byte-wide popcounts instead of per-cell masks
+    both_yes = np.count_nonzero(ua & ub)
+    a_yes_b_no = np.count_nonzero(ua) - both_yes
+    a_no_b_yes = np.count_nonzero(ub) - both_yes
+    both_no = ua.size - both_yes - a_yes_b_no - a_no_b_yes
     b = a_yes_b_no
     c = a_no_b_yes
     if (b + c) == 0:
         return 0.0, 1.0, [[both_yes, b], [c, both_no]]
     stat = (abs(b - c) - 1) ** 2 / (b + c)
-    p_value = 1 - stats.chi2.cdf(stat, df=1)
+    # chi2 survival function specialized to df=1: P(X > s) = erfc(sqrt(s/2))
+    p_value = math.erfc(math.sqrt(stat / 2.0))
     return stat, p_value, [[both_yes, b], [c, both_no]]
 
 
+def _spearman_rho(x, y):
+    """Pearson correlation of average ranks (ties as in scipy)."""
+    rx = stats.rankdata(x)
+    ry = stats.rankdata(y)
+    rx -= rx.mean()
+    ry -= ry.mean()
+    den = np.sqrt(np.dot(rx, rx) * np.dot(ry, ry))
+    return np.dot(rx, ry) / den if den > 0 else np.nan
+
+
+def spearman_rho_p(x, y):
+    """Spearman rho and two-sided p-value (t-distribution, as scipy)."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    rho = float(_spearman_rho(x, y))
+    n = x.size
+    if n < 3 or np.isnan(rho):
+        return rho, np.nan
+    if abs(rho) >= 1.0:
+        return rho, 0.0
+    t = rho * np.sqrt((n - 2) / ((1.0 - rho) * (1.0 + rho)))
+    return rho, float(2 * stats.t.sf(abs(t), n - 2))
+
+
 def spearman_with_ci(x, y, confidence=0.95):
     """Spearman rho with Fisher z-transform confidence interval."""
-    rho, p = stats.spearmanr(x, y)
+    rho, p = spearman_rho_p(x, y)
     n = len(x)
     if n < 4:
         return rho, p, (np.nan, np.nan)
     # Fisher z-transform for CI
     z = np.arctanh(rho)
     se = 1.0 / np.sqrt(n - 3)
-    z_crit = stats.norm.ppf(1 - (1 - confidence) / 2)
+    z_crit = _Z95 if confidence == 0.95 else stats.norm.ppf(1 - (1 - confidence) / 2)
     ci_low = np.tanh(z - z_crit * se)
     ci_high = np.tanh(z + z_crit * se)
     return rho, p, (ci_low, ci_high)
 
 
+# Skewed-condition columns as plain NumPy arrays, extracted once in main()
+SkewedArrays = namedtuple('SkewedArrays', ['sp', 'inl', 'opt', 'ir', 'thresh', 'hot'])
+
+
+def skewed_arrays(skewed):
+    """Materialize the skewed columns used by the tests (None if absent)."""
+    def col(name):
+        return skewed[name].to_numpy() if name in skewed.columns else None
+    return SkewedArrays(sp=col('shadow_price'), inl=col('inlined'),
+                        opt=col('opt_level'), ir=col('ir_count'),
+                        thresh=col('threshold_baseline'), hot=col('hot'))
+
+
 # ---- Load Data ----
 
 def load_data():
@@ -95,7 +195,11 @@ def load_data():
     for cond in CONDITIONS:
         path = os.path.join(RESULTS_DIR, f'{cond}_decisions.csv')
         try:
-            df = pd.read_csv(path)
+            # pyarrow needs an explicit column list; peek at the header so
+            # v1 CSVs without opt_level still load
+            usecols = [c for c in pd.read_csv(path, nrows=0).columns if c in COL_DTYPES]
+            df = pd.read_csv(path, dtype=COL_DTYPES, engine=CSV_ENGINE,
+                             usecols=usecols)
             data[cond] = df
             n_opts = df['opt_level'].nunique() if 'opt_level' in df.columns else 1
             print(f"  Loaded {path}: {len(df)} rows, {n_opts} opt level(s)")
@@ -106,26 +210,27 @@ def load_data():
             print(f"  ERROR reading {path}: {e}")
             sys.exit(1)
     print()
-    return data
+    # Per-condition inlining rates, computed once for the summary chart
+    rates = {c: float(df['inlined'].mean()) for c, df in data.items()}
+    return data, rates
 
 
 # ============================================================
 # CORE TESTS (1-3)
 # ============================================================
 
-def test_spearman(data):
+def test_spearman(sk):
     print("=" * 60)
     print("Test 1: Spearman Correlation (Skewed Condition, All Levels)")
     print("=" * 60)
 
-    skewed = data['skewed']
-    rho, p_val, ci = spearman_with_ci(skewed['shadow_price'], skewed['inlined'])
+    rho, p_val, ci = spearman_with_ci(sk.sp, sk.inl)
     passed = (abs(rho) > SPEARMAN_RHO_THRESHOLD) and (p_val < ALPHA)
 
     print(f"  rho (correlation): {rho:.4f}")
     print(f"  95% CI:            [{ci[0]:.4f}, {ci[1]:.4f}]")
     print(f"  p-value:           {p_val:.2e}")
-    print(f"  n:                 {len(skewed)}")
+    print(f"  n:                 {sk.sp.size}")
     print(f"  Threshold:         |rho| > {SPEARMAN_RHO_THRESHOLD}, p < {ALPHA}")
     sym = "\u2713" if passed else "\u2717"
     print(f"  Result:            {sym} {'PASS' if passed else 'FAIL'}")
@@ -134,16 +239,15 @@ def test_spearman(data):
     return passed, rho, p_val, ci
 
 
-def test_cohens_d(data):
+def test_cohens_d(sk, median_price, split):
     print("=" * 60)
     print("Test 2: Cohen's d (Hot vs Cold Shadow Price)")
     print("=" * 60)
 
-    skewed = data['skewed']
-    median_price = skewed['shadow_price'].median()
-    hot = skewed[skewed['shadow_price'] > median_price]['inlined']
-    cold = skewed[skewed['shadow_price'] <= median_price]['inlined']
-    d = cohens_d(hot.values, cold.values)
+    # sk is sorted by shadow_price: cold and hot are contiguous slices
+    cold = sk.inl[:split]
+    hot = sk.inl[split:]
+    d = cohens_d_binary(hot, cold) if is_binary(sk.inl) else cohens_d(hot, cold)
     passed = abs(d) > COHENS_D_THRESHOLD
     hot_rate = hot.mean() * 100
     cold_rate = cold.mean() * 100
@@ -166,13 +270,17 @@ def test_mcnemar(data):
 
     skewed = data['skewed']
     perturbed = data['perturbed']
-    merged = pd.merge(skewed[['func_name', 'inlined']],
-                       perturbed[['func_name', 'inlined']],
-                       on='func_name', suffixes=('_skewed', '_perturbed'))
+    # Join on int codes from one shared factorization, not on the strings
+    codes, _ = pd.factorize(pd.concat([skewed['func_name'], perturbed['func_name']]))
+    n_sk = len(skewed)
+    merged = pd.merge(skewed[['inlined']].assign(key=codes[:n_sk]),
+                       perturbed[['inlined']].assign(key=codes[n_sk:]),
+                       on='key', suffixes=('_skewed', '_perturbed'),
+                       validate='one_to_one')
 
     stat, p_val, table = mcnemar_test(
-        merged['inlined_skewed'].values,
-        merged['inlined_perturbed'].values
+        merged['inlined_skewed'].to_numpy(dtype=np.int8, copy=False),
+        merged['inlined_perturbed'].to_numpy(dtype=np.int8, copy=False)
     )
 
     discordant = table[0][1] + table[1][0]
@@ -216,7 +324,7 @@ def test_mcnemar(data):
 # STRATIFIED ANALYSES (4-5)
 # ============================================================
 
-def analyze_by_opt_level(data):
+def analyze_by_opt_level(sk, strata):
     """
     Stratified analysis 4: Spearman rho per optimization level.
     
@@ -228,26 +336,33 @@ def analyze_by_opt_level(data):
     print("Analysis 4: Stratified by Optimization Level (Skewed)")
     print("=" * 60)
 
-    skewed = data['skewed']
-
-    if 'opt_level' not in skewed.columns:
+    if sk.opt is None:
         print("  SKIP: opt_level column not found (v1 data)")
         print()
-        return {}
+        return {}, None
+
+    # Upcast once so the per-level slices go straight to the rank kernel
+    sp = sk.sp.astype(np.float64)
+    inl_all = sk.inl.astype(np.float64)
 
     results = {}
-    for opt in sorted(skewed['opt_level'].unique()):
-        subset = skewed[skewed['opt_level'] == opt]
-        rho, p, ci = spearman_with_ci(subset['shadow_price'], subset['inlined'])
-        n = len(subset)
-        inline_rate = subset['inlined'].mean() * 100
+    for opt in strata['opt_levels']:
+        mask = sk.opt == opt
+        inl = inl_all[mask]
+        rho, p, ci = spearman_with_ci(sp[mask], inl)
+        n = inl.size
+        inline_rate = inl.mean() * 100
+        hot = sk.hot[mask]
+        hot_rate = inl[hot].mean() * 100 if hot.any() else 0
+        cold_rate = inl[~hot].mean() * 100 if not hot.all() else 0
         label = OPT_LABELS.get(opt, f'O{opt}')
 
         results[opt] = {
             'rho': rho, 'p': p, 'ci': ci,
             'n': n, 'inline_rate': inline_rate,
+            'hot_rate': hot_rate, 'cold_rate': cold_rate,
             'label': label,
-            'threshold': subset['threshold_baseline'].iloc[0] if len(subset) > 0 else 0
+            'threshold': int(sk.thresh[mask][0]) if n > 0 else 0
         }
 
         sig = "\u2713" if (abs(rho) > 0.5 and p < 0.05) else "\u2717"
@@ -257,8 +372,8 @@ def analyze_by_opt_level(data):
 
     # Cross-level consistency check
     rhos = [r['rho'] for r in results.values()]
+    rho_range = max(rhos) - min(rhos) if rhos else None
     if len(rhos) >= 2:
-        rho_range = max(rhos) - min(rhos)
         print(f"\n  Cross-level rho range: {rho_range:.4f}")
         if rho_range < 0.2:
             print("  Assessment: CONSISTENT across opt levels")
@@ -266,10 +381,10 @@ def analyze_by_opt_level(data):
             print("  Assessment: VARIABLE across opt levels (worth discussing)")
     print()
 
-    return results
+    return results, rho_range
 
 
-def analyze_by_size(data):
+def analyze_by_size(data, sk, strata):
     """
     Stratified analysis 5: Inlining rate by function size bucket.
     
@@ -291,23 +406,39 @@ def analyze_by_size(data):
     skewed = data['skewed']
     results = {}
 
-    for size in sorted(skewed['ir_count'].unique()):
-        subset = skewed[skewed['ir_count'] == size]
-        n = len(subset)
-        inline_rate = subset['inlined'].mean() * 100
-
-        # Split into hot/cold for this size
-        median_p = skewed['shadow_price'].median()
-        hot = subset[subset['shadow_price'] > median_p]['inlined']
-        cold = subset[subset['shadow_price'] <= median_p]['inlined']
-        hot_rate = hot.mean() * 100 if len(hot) > 0 else 0
-        cold_rate = cold.mean() * 100 if len(cold) > 0 else 0
-
-        # Spearman within this size (if enough variance)
-        if subset['inlined'].nunique() > 1 and subset['shadow_price'].nunique() > 1:
-            rho_size, p_size = stats.spearmanr(subset['shadow_price'], subset['inlined'])
-        else:
-            rho_size, p_size = 0.0, 1.0
+    sizes, counts = strata['ir_sizes'], strata['ir_counts']
+    # 0/1 byte buffers so the hot/cold split is a bitwise AND per size;
+    # hot comes from the precomputed 'hot' column (global median)
+    inl_u8 = sk.inl.view(np.uint8)
+    hot_u8 = sk.hot.view(np.uint8)
+
+    # Spearman within each size in one groupby-corr call; p-values from
+    # the t-distribution evaluated across all sizes at once. Sizes with
+    # no variance (NaN rho) report rho=0, p=1.
+    rho_by_size = (skewed.groupby('ir_count')[['shadow_price', 'inlined']]
+                   .corr(method='spearman')
+                   .xs('shadow_price', level=1)['inlined']
+                   .reindex(sizes))
+    r = rho_by_size.to_numpy(dtype=np.float64)
+    dof = np.asarray(counts) - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = r * np.sqrt(dof / ((1.0 - r) * (1.0 + r)))
+    p_by_size = pd.Series(2 * stats.t.sf(np.abs(t), dof), index=rho_by_size.index)
+    undefined = np.isnan(r)
+    rho_by_size[undefined] = 0.0
+    p_by_size[undefined] = 1.0
+
+    for size, n in zip(sizes, counts):
+        m = sk.ir == size
+        inl_s = inl_u8[m]
+        hot_s = hot_u8[m]
+        n_hot = int(hot_s.sum())
+        n_inl = int(inl_s.sum())
+        n_hot_inl = int((inl_s & hot_s).sum())
+        inline_rate = n_inl / n * 100
+        hot_rate = n_hot_inl / n_hot * 100 if n_hot > 0 else 0
+        cold_rate = (n_inl - n_hot_inl) / (n - n_hot) * 100 if n > n_hot else 0
+        rho_size, p_size = rho_by_size[size], p_by_size[size]
 
         label = SIZE_LABELS.get(size, f'{size} IR')
         results[size] = {
@@ -340,7 +471,7 @@ def analyze_by_size(data):
         print("\n  No clear decision boundary found")
     print()
 
-    return results
+    return results, boundary_sizes
 
 
 # ============================================================
@@ -348,7 +479,7 @@ def analyze_by_size(data):
 # ============================================================
 
 def print_verdict(results):
-    num_passed = sum(results)
+    num_passed = results.count(True)
 
     print("=" * 60)
     print("VERDICT")
@@ -375,210 +506,212 @@ def print_verdict(results):
 # VISUALIZATION (3x3 grid)
 # ============================================================
 
-def create_visualization(data, rho, p_rho, ci_rho, d, hot_rate, cold_rate,
-                          verdict, opt_results, size_results):
+def create_visualization(data, condition_rates, rho, p_rho, ci_rho, d,
+                          hot_rate, cold_rate, verdict, opt_results, opt_rho_range,
+                          size_results, boundary_sizes, strata):
     """Create 3x3 subplot visualization with stratified analyses."""
-
-    fig, axes = plt.subplots(3, 3, figsize=(18, 16))
-    fig.suptitle('MIR NUM Experiment Results (v2 — Stratified)',
-                 fontsize=18, fontweight='bold', y=0.98)
-
-    skewed = data['skewed']
-
-    # ---- Row 0: Core Tests ----
-
-    # (0,0) Scatter: shadow_price vs inlined
-    ax = axes[0, 0]
-    jitter = np.random.uniform(-0.05, 0.05, len(skewed))
-    colors = ['#e74c3c' if x == 0 else '#2ecc71' for x in skewed['inlined']]
-    ax.scatter(skewed['shadow_price'], skewed['inlined'] + jitter,
-               c=colors, alpha=0.4, s=20, edgecolors='none')
-    ax.set_xlabel('Shadow Price (\u03BB)')
-    ax.set_ylabel('Inlined (0/1)')
-    ax.set_title(f'Test 1: Spearman Correlation\n\u03C1={rho:.3f} [{ci_rho[0]:.2f}, {ci_rho[1]:.2f}], p={p_rho:.1e}')
-    ax.set_yticks([0, 1])
-    ax.set_yticklabels(['No', 'Yes'])
-
-    # (0,1) Hot vs Cold bar
-    ax = axes[0, 1]
-    bars = ax.bar(['Hot\n(high \u03BB)', 'Cold\n(low \u03BB)'],
-                   [hot_rate, cold_rate],
-                   color=['#e74c3c', '#3498db'], alpha=0.8, width=0.5)
-    ax.set_ylabel('Inlining Rate (%)')
-    ax.set_title(f"Test 2: Hot vs Cold\nCohen's d = {d:.3f}")
-    ax.set_ylim(0, 105)
-    for bar, rate in zip(bars, [hot_rate, cold_rate]):
-        ax.text(bar.get_x() + bar.get_width() / 2., bar.get_height() + 2,
-                f'{rate:.1f}%', ha='center', va='bottom', fontweight='bold')
-
-    # (0,2) All conditions bar
-    ax = axes[0, 2]
-    rates = [data[c]['inlined'].mean() * 100 for c in CONDITIONS]
-    colors_bar = ['#95a5a6', '#95a5a6', '#e67e22', '#9b59b6']
-    bars = ax.bar(CONDITIONS, rates, color=colors_bar, alpha=0.8, width=0.6)
-    ax.set_ylabel('Mean Inlining Rate (%)')
-    ax.set_title('Inlining Rate by Condition')
-    ax.set_ylim(0, 105)
-    for bar, rate in zip(bars, rates):
-        ax.text(bar.get_x() + bar.get_width() / 2., bar.get_height() + 2,
-                f'{rate:.1f}%', ha='center', va='bottom', fontsize=9)
-
-    # ---- Row 1: Opt-Level Stratification ----
-
-    if opt_results:
-        # (1,0) Rho by opt level
-        ax = axes[1, 0]
-        opt_levels = sorted(opt_results.keys())
-        rhos = [opt_results[o]['rho'] for o in opt_levels]
-        ci_lows = [opt_results[o]['ci'][0] for o in opt_levels]
-        ci_highs = [opt_results[o]['ci'][1] for o in opt_levels]
-        labels = [f"O{o}" for o in opt_levels]
-        yerr_low = [r - cl for r, cl in zip(rhos, ci_lows)]
-        yerr_high = [ch - r for r, ch in zip(rhos, ci_highs)]
-        bars = ax.bar(labels, rhos, color='#2980b9', alpha=0.8, width=0.5,
-                       yerr=[yerr_low, yerr_high], capsize=8, error_kw={'linewidth': 2})
-        ax.axhline(y=0.5, color='red', linestyle='--', alpha=0.5, label='\u03C1=0.5 threshold')
-        ax.set_ylabel('Spearman \u03C1')
-        ax.set_title('Analysis 4: \u03C1 by Opt Level\n(Is \u03BB-sensitivity level-dependent?)')
-        ax.set_ylim(0, 1.05)
-        ax.legend(fontsize=9)
-
-        # (1,1) Inlining rate by opt level (hot vs cold)
-        ax = axes[1, 1]
-        x = np.arange(len(opt_levels))
-        width = 0.35
-        hot_rates_opt = []
-        cold_rates_opt = []
-        for o in opt_levels:
-            subset = skewed[skewed['opt_level'] == o]
-            med = skewed['shadow_price'].median()
-            hr = subset[subset['shadow_price'] > med]['inlined'].mean() * 100
-            cr = subset[subset['shadow_price'] <= med]['inlined'].mean() * 100
-            hot_rates_opt.append(hr)
-            cold_rates_opt.append(cr)
-        ax.bar(x - width/2, hot_rates_opt, width, label='Hot (\u03BB high)',
-               color='#e74c3c', alpha=0.8)
-        ax.bar(x + width/2, cold_rates_opt, width, label='Cold (\u03BB low)',
-               color='#3498db', alpha=0.8)
-        ax.set_xticks(x)
-        ax.set_xticklabels([f"O{o}\n(t={opt_results[o]['threshold']})" for o in opt_levels])
+    # Imported here so CLI-only runs (NUM_NO_PLOT) skip matplotlib startup
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import LinearSegmentedColormap
+
+    # Simplify and chunk long paths so the dense scatter rasterizes quickly;
+    # scoped so the caller's rcParams are left untouched
+    with plt.rc_context({'path.simplify': True, 'agg.path.chunksize': 10000}):
+        fig, axes = plt.subplots(3, 3, figsize=(18, 16))
+        fig.suptitle('MIR NUM Experiment Results (v2 — Stratified)',
+                     fontsize=18, fontweight='bold', y=0.98)
+
+        skewed = data['skewed']
+
+        # ---- Row 0: Core Tests ----
+
+        # (0,0) Scatter: shadow_price vs inlined
+        ax = axes[0, 0]
+        inl = skewed['inlined'].to_numpy()
+        rng = np.random.default_rng(0)
+        jitter = rng.uniform(-0.05, 0.05, inl.size)
+        ax.scatter(skewed['shadow_price'].to_numpy(), inl + jitter,
+                   c=_SCAT_RGBA[inl], s=20, edgecolors='none')
+        ax.set_xlabel('Shadow Price (\u03BB)')
+        ax.set_ylabel('Inlined (0/1)')
+        ax.set_title(f'Test 1: Spearman Correlation\n\u03C1={rho:.3f} [{ci_rho[0]:.2f}, {ci_rho[1]:.2f}], p={p_rho:.1e}')
+        ax.set_yticks([0, 1])
+        ax.set_yticklabels(['No', 'Yes'])
+
+        # (0,1) Hot vs Cold bar
+        ax = axes[0, 1]
+        bars = ax.bar(['Hot\n(high \u03BB)', 'Cold\n(low \u03BB)'],
+                       [hot_rate, cold_rate],
+                       color=['#e74c3c', '#3498db'], alpha=0.8, width=0.5)
         ax.set_ylabel('Inlining Rate (%)')
-        ax.set_title('Hot vs Cold by Opt Level')
+        ax.set_title(f"Test 2: Hot vs Cold\nCohen's d = {d:.3f}")
         ax.set_ylim(0, 105)
-        ax.legend(fontsize=9)
-    else:
-        axes[1, 0].text(0.5, 0.5, 'No opt_level data\n(v1 CSV format)',
-                         transform=axes[1, 0].transAxes, ha='center', va='center')
-        axes[1, 0].set_title('Analysis 4: Opt Level Stratification')
-        axes[1, 1].axis('off')
-
-    # (1,2) Opt level summary table
-    ax = axes[1, 2]
-    ax.axis('off')
-    if opt_results:
-        table_data = []
-        for o in sorted(opt_results.keys()):
-            r = opt_results[o]
-            sig = "\u2713" if abs(r['rho']) > 0.5 else "\u2717"
-            table_data.append([f"O{o}", f"{r['threshold']}",
-                                f"{r['inline_rate']:.1f}%",
-                                f"{r['rho']:.3f}", sig])
-        table = ax.table(cellText=table_data,
-                          colLabels=['Level', 'Thresh', 'Rate', '\u03C1', 'Sig'],
-                          loc='center', cellLoc='center')
-        table.auto_set_font_size(False)
-        table.set_fontsize(11)
-        table.scale(1, 1.8)
-        ax.set_title('Opt Level Summary', fontsize=12, pad=20)
-
-    # ---- Row 2: Size Stratification ----
-
-    if size_results:
-        # (2,0) Inlining rate by size (hot vs cold)
-        ax = axes[2, 0]
-        sz = sorted(size_results.keys())
-        hot_by_size = [size_results[s]['hot_rate'] for s in sz]
-        cold_by_size = [size_results[s]['cold_rate'] for s in sz]
-        x = np.arange(len(sz))
-        width = 0.35
-        ax.bar(x - width/2, hot_by_size, width, label='Hot (\u03BB high)',
-               color='#e74c3c', alpha=0.8)
-        ax.bar(x + width/2, cold_by_size, width, label='Cold (\u03BB low)',
-               color='#3498db', alpha=0.8)
-        ax.set_xticks(x)
-        ax.set_xticklabels([str(s) for s in sz])
-        ax.set_xlabel('Function Size (IR instructions)')
-        ax.set_ylabel('Inlining Rate (%)')
-        ax.set_title('Analysis 5: Hot vs Cold by Size\n(Where does \u03BB matter?)')
+        for bar, rate in zip(bars, [hot_rate, cold_rate]):
+            ax.text(bar.get_x() + bar.get_width() / 2., bar.get_height() + 2,
+                    f'{rate:.1f}%', ha='center', va='bottom', fontweight='bold')
+
+        # (0,2) All conditions bar
+        ax = axes[0, 2]
+        rates = [condition_rates[c] * 100 for c in CONDITIONS]
+        colors_bar = ['#95a5a6', '#95a5a6', '#e67e22', '#9b59b6']
+        bars = ax.bar(CONDITIONS, rates, color=colors_bar, alpha=0.8, width=0.6)
+        ax.set_ylabel('Mean Inlining Rate (%)')
+        ax.set_title('Inlining Rate by Condition')
         ax.set_ylim(0, 105)
-        ax.legend(fontsize=9)
-
-        # Annotate decision boundary
-        for i, s in enumerate(sz):
-            diff = abs(size_results[s]['hot_rate'] - size_results[s]['cold_rate'])
-            if diff > 20:
-                ax.annotate('\u2190 decision\n   boundary',
-                            xy=(i, max(hot_by_size[i], cold_by_size[i]) + 3),
-                            fontsize=8, color='#e67e22', fontweight='bold',
-                            ha='center')
-
-        # (2,1) Heatmap: size x shadow_price -> inlining rate
-        ax = axes[2, 1]
-        if 'opt_level' in skewed.columns:
-            # Use opt_level=1 (moderate) for the heatmap
-            hm_data = skewed[skewed['opt_level'] == 1] if 1 in skewed['opt_level'].values else skewed
+        for bar, rate in zip(bars, rates):
+            ax.text(bar.get_x() + bar.get_width() / 2., bar.get_height() + 2,
+                    f'{rate:.1f}%', ha='center', va='bottom', fontsize=9)
+
+        # ---- Row 1: Opt-Level Stratification ----
+
+        if opt_results:
+            # (1,0) Rho by opt level
+            ax = axes[1, 0]
+            opt_levels = strata['opt_levels']
+            rhos = [opt_results[o]['rho'] for o in opt_levels]
+            ci_lows = [opt_results[o]['ci'][0] for o in opt_levels]
+            ci_highs = [opt_results[o]['ci'][1] for o in opt_levels]
+            labels = [f"O{o}" for o in opt_levels]
+            yerr_low = [r - cl for r, cl in zip(rhos, ci_lows)]
+            yerr_high = [ch - r for r, ch in zip(rhos, ci_highs)]
+            bars = ax.bar(labels, rhos, color='#2980b9', alpha=0.8, width=0.5,
+                           yerr=[yerr_low, yerr_high], capsize=8, error_kw={'linewidth': 2})
+            ax.axhline(y=0.5, color='red', linestyle='--', alpha=0.5, label='\u03C1=0.5 threshold')
+            ax.set_ylabel('Spearman \u03C1')
+            ax.set_title('Analysis 4: \u03C1 by Opt Level\n(Is \u03BB-sensitivity level-dependent?)')
+            ax.set_ylim(0, 1.05)
+            ax.legend(fontsize=9)
+
+            # (1,1) Inlining rate by opt level (hot vs cold)
+            ax = axes[1, 1]
+            x = np.arange(len(opt_levels))
+            width = 0.35
+            hot_rates_opt = [opt_results[o]['hot_rate'] for o in opt_levels]
+            cold_rates_opt = [opt_results[o]['cold_rate'] for o in opt_levels]
+            ax.bar(x - width/2, hot_rates_opt, width, label='Hot (\u03BB high)',
+                   color='#e74c3c', alpha=0.8)
+            ax.bar(x + width/2, cold_rates_opt, width, label='Cold (\u03BB low)',
+                   color='#3498db', alpha=0.8)
+            ax.set_xticks(x)
+            ax.set_xticklabels([f"O{o}\n(t={opt_results[o]['threshold']})" for o in opt_levels])
+            ax.set_ylabel('Inlining Rate (%)')
+            ax.set_title('Hot vs Cold by Opt Level')
+            ax.set_ylim(0, 105)
+            ax.legend(fontsize=9)
         else:
-            hm_data = skewed
-        pivot = hm_data.pivot_table(values='inlined', index='ir_count',
-                                     columns='shadow_price', aggfunc='mean')
-        # Sort index for display
-        pivot = pivot.sort_index(ascending=True)
-        cmap = LinearSegmentedColormap.from_list('rg', ['#3498db', '#f1c40f', '#e74c3c'])
-        im = ax.imshow(pivot.values, aspect='auto', cmap=cmap, vmin=0, vmax=1)
-        ax.set_xticks(range(len(pivot.columns)))
-        ax.set_xticklabels([f'{c:.0f}' for c in pivot.columns], fontsize=8)
-        ax.set_yticks(range(len(pivot.index)))
-        ax.set_yticklabels([str(s) for s in pivot.index])
-        ax.set_xlabel('Shadow Price (\u03BB)')
-        ax.set_ylabel('IR Count')
-        ax.set_title('Inlining Heatmap (O1)\nRed=inlined, Blue=not')
-        plt.colorbar(im, ax=ax, shrink=0.8, label='P(inlined)')
+            axes[1, 0].text(0.5, 0.5, 'No opt_level data\n(v1 CSV format)',
+                             transform=axes[1, 0].transAxes, ha='center', va='center')
+            axes[1, 0].set_title('Analysis 4: Opt Level Stratification')
+            axes[1, 1].axis('off')
 
-        # (2,2) Verdict and full summary
-        ax = axes[2, 2]
+        # (1,2) Opt level summary table
+        ax = axes[1, 2]
         ax.axis('off')
-        verdict_color = {'CORROBORATES': '#27ae60', 'PARTIAL': '#f39c12',
-                          'DISPROVES': '#e74c3c'}
-        color = verdict_color.get(verdict, '#333333')
-        ax.text(0.5, 0.8, f'VERDICT: {verdict}',
-                transform=ax.transAxes, fontsize=22, fontweight='bold',
-                ha='center', va='center', color=color)
-
-        lines = [
-            f'Spearman \u03C1 = {rho:.3f}  [CI: {ci_rho[0]:.2f}, {ci_rho[1]:.2f}]',
-            f"Cohen's d = {d:.3f}",
-            f'Hot = {hot_rate:.1f}%  Cold = {cold_rate:.1f}%',
-            '',
-            'Opt-level: \u03C1 consistent' if opt_results and
-            (max(r['rho'] for r in opt_results.values()) -
-             min(r['rho'] for r in opt_results.values()) < 0.2)
-            else 'Opt-level: \u03C1 varies by level',
-            f'Decision boundary: {[s for s in sorted(size_results.keys()) if abs(size_results[s]["hot_rate"] - size_results[s]["cold_rate"]) > 20]} IR'
-            if size_results else '',
-        ]
-        ax.text(0.5, 0.35, '\n'.join(lines),
-                transform=ax.transAxes, fontsize=10, ha='center', va='center',
-                family='monospace', linespacing=1.6)
-    else:
-        for i in range(3):
-            axes[2, i].text(0.5, 0.5, 'No size stratification data',
-                             transform=axes[2, i].transAxes, ha='center')
+        if opt_results:
+            table_data = []
+            for o in strata['opt_levels']:
+                r = opt_results[o]
+                sig = "\u2713" if abs(r['rho']) > 0.5 else "\u2717"
+                table_data.append([f"O{o}", f"{r['threshold']}",
+                                    f"{r['inline_rate']:.1f}%",
+                                    f"{r['rho']:.3f}", sig])
+            table = ax.table(cellText=table_data,
+                              colLabels=['Level', 'Thresh', 'Rate', '\u03C1', 'Sig'],
+                              loc='center', cellLoc='center')
+            table.auto_set_font_size(False)
+            table.set_fontsize(11)
+            table.scale(1, 1.8)
+            ax.set_title('Opt Level Summary', fontsize=12, pad=20)
+
+        # ---- Row 2: Size Stratification ----
+
+        if size_results:
+            # (2,0) Inlining rate by size (hot vs cold)
+            ax = axes[2, 0]
+            sz = strata['ir_sizes']
+            hot_by_size = [size_results[s]['hot_rate'] for s in sz]
+            cold_by_size = [size_results[s]['cold_rate'] for s in sz]
+            x = np.arange(len(sz))
+            width = 0.35
+            ax.bar(x - width/2, hot_by_size, width, label='Hot (\u03BB high)',
+                   color='#e74c3c', alpha=0.8)
+            ax.bar(x + width/2, cold_by_size, width, label='Cold (\u03BB low)',
+                   color='#3498db', alpha=0.8)
+            ax.set_xticks(x)
+            ax.set_xticklabels([str(s) for s in sz])
+            ax.set_xlabel('Function Size (IR instructions)')
+            ax.set_ylabel('Inlining Rate (%)')
+            ax.set_title('Analysis 5: Hot vs Cold by Size\n(Where does \u03BB matter?)')
+            ax.set_ylim(0, 105)
+            ax.legend(fontsize=9)
+
+            # Annotate decision boundary
+            for i, s in enumerate(sz):
+                if s in boundary_sizes:
+                    ax.annotate('\u2190 decision\n   boundary',
+                                xy=(i, max(hot_by_size[i], cold_by_size[i]) + 3),
+                                fontsize=8, color='#e67e22', fontweight='bold',
+                                ha='center')
+
+            # (2,1) Heatmap: size x shadow_price -> inlining rate
+            ax = axes[2, 1]
+            # Use opt_level=1 (moderate) for the heatmap when present
+            hm_data = skewed[skewed['opt_level'] == 1] if 1 in strata['opt_levels'] else skewed
+            # Mean inlined per (ir_count, shadow_price) cell via direct 2-D
+            # accumulation over sorted factor codes (no pivot_table machinery)
+            ir_codes, ir_uniq = pd.factorize(hm_data['ir_count'], sort=True)
+            sp_codes, sp_uniq = pd.factorize(hm_data['shadow_price'], sort=True)
+            shape = (ir_uniq.size, sp_uniq.size)
+            sums = np.zeros(shape, dtype=np.float64)
+            cnts = np.zeros(shape, dtype=np.int32)
+            np.add.at(sums, (ir_codes, sp_codes), hm_data['inlined'].to_numpy())
+            np.add.at(cnts, (ir_codes, sp_codes), 1)
+            pivot_values = np.divide(sums, cnts, out=np.full(shape, np.nan), where=cnts > 0)
+            cmap = LinearSegmentedColormap.from_list('rg', ['#3498db', '#f1c40f', '#e74c3c'])
+            im = ax.imshow(pivot_values, aspect='auto', cmap=cmap, vmin=0, vmax=1)
+            ax.set_xticks(range(sp_uniq.size))
+            ax.set_xticklabels([f'{c:.0f}' for c in sp_uniq], fontsize=8)
+            ax.set_yticks(range(ir_uniq.size))
+            ax.set_yticklabels([str(s) for s in ir_uniq])
+            ax.set_xlabel('Shadow Price (\u03BB)')
+            ax.set_ylabel('IR Count')
+            ax.set_title('Inlining Heatmap (O1)\nRed=inlined, Blue=not')
+            plt.colorbar(im, ax=ax, shrink=0.8, label='P(inlined)')
+
+            # (2,2) Verdict and full summary
+            ax = axes[2, 2]
+            ax.axis('off')
+            verdict_color = {'CORROBORATES': '#27ae60', 'PARTIAL': '#f39c12',
+                              'DISPROVES': '#e74c3c'}
+            color = verdict_color.get(verdict, '#333333')
+            ax.text(0.5, 0.8, f'VERDICT: {verdict}',
+                    transform=ax.transAxes, fontsize=22, fontweight='bold',
+                    ha='center', va='center', color=color)
+
+            lines = [
+                f'Spearman \u03C1 = {rho:.3f}  [CI: {ci_rho[0]:.2f}, {ci_rho[1]:.2f}]',
+                f"Cohen's d = {d:.3f}",
+                f'Hot = {hot_rate:.1f}%  Cold = {cold_rate:.1f}%',
+                '',
+                'Opt-level: \u03C1 consistent' if opt_results and opt_rho_range < 0.2
+                else 'Opt-level: \u03C1 varies by level',
+                f'Decision boundary: {boundary_sizes} IR' if size_results else '',
+            ]
+            ax.text(0.5, 0.35, '\n'.join(lines),
+                    transform=ax.transAxes, fontsize=10, ha='center', va='center',
+                    family='monospace', linespacing=1.6)
+        else:
+            for i in range(3):
+                axes[2, i].text(0.5, 0.5, 'No size stratification data',
+                                 transform=axes[2, i].transAxes, ha='center')
 
-    plt.tight_layout(rect=[0, 0, 1, 0.96])
-    output_path = os.path.join(RESULTS_DIR, 'num-analysis.png')
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
-    print(f"Visualization saved to: {output_path}")
-    plt.close()
+        plt.tight_layout(rect=[0, 0, 1, 0.96])
+        output_path = os.path.join(RESULTS_DIR, 'num-analysis.png')
+        plt.savefig(output_path, dpi=150, bbox_inches='tight')
+        print(f"Visualization saved to: {output_path}")
+        plt.close()
 
 
 # ============================================================
@@ -591,30 +724,56 @@ def main():
     print("=" * 60)
     print()
 
-    data = load_data()
+    data, rates = load_data()
+
+    # Hot/cold split shared by every test: computed once, reused everywhere.
+    # With skewed sorted by shadow_price, hot rows are the contiguous tail
+    # starting at split, so the split needs no mask.
+    skewed = data['skewed'].sort_values('shadow_price', kind='mergesort',
+                                        ignore_index=True)
+    data['skewed'] = skewed
+    sorted_prices = skewed['shadow_price'].to_numpy()
+    median_price = float(np.median(sorted_prices))
+    split = int(np.searchsorted(sorted_prices, median_price, side='right'))
+    skewed['hot'] = np.arange(len(skewed)) >= split
+    sk = skewed_arrays(skewed)
+
+    # Sorted strata keys, computed once and shared by analyses and plots
+    ir_sizes, ir_counts = np.unique(sk.ir, return_counts=True)
+    strata = {
+        'opt_levels': np.unique(sk.opt).tolist() if sk.opt is not None else [],
+        'ir_sizes': ir_sizes.tolist(),
+        'ir_counts': ir_counts.tolist(),
+    }
 
     # Core tests
-    pass1, rho, p_rho, ci_rho = test_spearman(data)
-    pass2, d, hot_rate, cold_rate = test_cohens_d(data)
+    pass1, rho, p_rho, ci_rho = test_spearman(sk)
+    pass2, d, hot_rate, cold_rate = test_cohens_d(sk, median_price, split)
     pass3, mcnemar_stat, mcnemar_p = test_mcnemar(data)
 
     # Stratified analyses
-    opt_results = analyze_by_opt_level(data)
-    size_results = analyze_by_size(data)
+    opt_results, opt_rho_range = analyze_by_opt_level(sk, strata)
+    size_results, boundary_sizes = analyze_by_size(data, sk, strata)
 
     # Verdict
     verdict = print_verdict([pass1, pass2, pass3])
+    exit_code = 0 if verdict in ("CORROBORATES", "PARTIAL") else 1
+
+    if os.environ.get('NUM_NO_PLOT', '') not in ('', '0'):
+        print("Visualization skipped (NUM_NO_PLOT set)")
+        return exit_code
 
     # Visualization
     try:
-        create_visualization(data, rho, p_rho, ci_rho, d, hot_rate, cold_rate,
-                              verdict, opt_results, size_results)
+        create_visualization(data, rates, rho, p_rho, ci_rho, d, hot_rate, cold_rate,
+                              verdict, opt_results, opt_rho_range,
+                              size_results, boundary_sizes, strata)
     except Exception as e:
         print(f"WARNING: Could not create visualization: {e}")
         import traceback
         traceback.print_exc()
 
-    return 0 if verdict in ("CORROBORATES", "PARTIAL") else 1
+    return exit_code
 
 
 if __name__ == '__main__':